@@ -141,7 +141,7 @@ static void handle_read(proto_request_t *req) {
   }
 
   icsp_enter_lvp();
-  uint8_t buf[PROTO_MAX_PAYLOAD];
+  static uint8_t buf[PROTO_MAX_PAYLOAD];
 
   if (addr >= 0x310000) {
     /* EEPROM: each word's low byte is one data byte */
@@ -219,8 +219,15 @@ static void handle_test_eeprom(proto_request_t *req) {
 }
 
 static void handle_version(proto_request_t *req) {
+  /* Response: version string + NUL + max_payload(2 LE) */
   const char *ver = VERSION_STRING;
-  proto_send_response(STATUS_OK, (const uint8_t *)ver, (uint16_t)strlen(ver));
+  size_t ver_len = strlen(ver);
+  uint8_t resp[64];
+  memcpy(resp, ver, ver_len);
+  resp[ver_len] = 0;
+  resp[ver_len + 1] = PROTO_MAX_PAYLOAD & 0xFF;
+  resp[ver_len + 2] = (PROTO_MAX_PAYLOAD >> 8) & 0xFF;
+  proto_send_response(STATUS_OK, resp, (uint16_t)(ver_len + 3));
 }
 
 int main(void) {
@@ -231,7 +238,7 @@ int main(void) {
 
   icsp_init(spi0, 29, 7, 6, 4);
 
-  proto_request_t req;
+  static proto_request_t req;
 
   while (true) {
     if (!proto_read_request(&req))
@@ -56,7 +56,7 @@ bool proto_read_request(proto_request_t *req) {
     uint8_t received_crc = (uint8_t)c;
 
     /* Compute CRC over cmd + len_lo + len_hi + payload */
-    uint8_t frame[3 + PROTO_MAX_PAYLOAD];
+    static uint8_t frame[3 + PROTO_MAX_PAYLOAD];
     frame[0] = req->cmd;
     frame[1] = (uint8_t)(req->len & 0xFF);
     frame[2] = (uint8_t)(req->len >> 8);
@@ -73,7 +73,7 @@ bool proto_read_request(proto_request_t *req) {
 
 void proto_send_response(uint8_t status, const uint8_t *payload, uint16_t len) {
     /* Build complete frame in one buffer to avoid USB CDC fragmentation */
-    uint8_t frame[4 + PROTO_MAX_PAYLOAD]; /* header(3) + payload + crc(1) */
+    static uint8_t frame[4 + PROTO_MAX_PAYLOAD]; /* header(3) + payload + crc(1) */
     frame[0] = status;
     frame[1] = (uint8_t)(len & 0xFF);
     frame[2] = (uint8_t)(len >> 8);
@@ -24,8 +24,9 @@
 #define STATUS_ERR_VERIFY  0x04
 #define STATUS_ERR_PAYLOAD 0x05
 
-/* Max payload size: 4 (addr) + 128 (page) = 132, round up */
-#define PROTO_MAX_PAYLOAD  256
+/* Max payload size: large enough for 1 KB READ responses (a write page is
+ * only 4 + 128 = 132). Frame buffers of this size are static, not on the stack. */
+#define PROTO_MAX_PAYLOAD  1024
 
 /* Frame structure:
  *   Request:  [CMD:1] [LEN:2 LE] [PAYLOAD:N] [CRC8:1]
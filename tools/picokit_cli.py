@@ -12,6 +12,12 @@ import time
 import serial
 from intelhex import IntelHex
 
+try:  # optional: compiled CRC loop
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
 # Protocol constants
 CMD_DIAG         = 0x01
 CMD_ERASE        = 0x02
@@ -44,27 +50,72 @@ FLASH_START     = 0x000000
 EEPROM_START    = 0x310000
 CONFIG_START    = 0x300000
 CONFIG_END      = 0x30000F
-READ_CHUNK      = 128  # bytes per READ command
+MAX_PAYLOAD     = 1024  # largest frame payload this host handles
+LEGACY_PAYLOAD  = 256   # firmware max payload when VERSION doesn't report one
+READ_CHUNK      = MAX_PAYLOAD  # default bytes per READ command
 
+ERASED_PAGE = b"\xFF" * FLASH_PAGE_SIZE
 
-def crc8(data: bytes) -> int:
-    """CRC-8 with polynomial 0x07, init 0x00."""
-    crc = 0x00
-    for b in data:
-        crc ^= b
+# Precompiled frame/payload layouts
+_HDR      = struct.Struct("<BH")  # cmd/status, len
+_U16      = struct.Struct("<H")
+_ADDR     = struct.Struct("<I")
+_ADDR_LEN = struct.Struct("<IH")  # addr, len
+
+# Addresses where a HEX segment must be split between flash/config/EEPROM
+REGION_BOUNDS = (CONFIG_START, CONFIG_END + 1, EEPROM_START)
+
+
+def _make_crc8_table(poly: int = 0x07) -> bytes:
+    """Precompute the 256-entry lookup table for a CRC-8 polynomial."""
+    table = bytearray(256)
+    for b in range(256):
+        crc = b
         for _ in range(8):
             if crc & 0x80:
-                crc = ((crc << 1) ^ 0x07) & 0xFF
+                crc = ((crc << 1) ^ poly) & 0xFF
             else:
                 crc = (crc << 1) & 0xFF
+        table[b] = crc
+    return bytes(table)
+
+
+_CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    """CRC-8 with polynomial 0x07, init 0x00 (table-driven)."""
+    table = _CRC8_TABLE  # local lookup in the inner loop
+    crc = 0x00
+    for b in data:
+        crc = table[crc ^ b]
     return crc
 
 
+if njit is not None:
+    _CRC8_TABLE_NP = np.frombuffer(_CRC8_TABLE, np.uint8)
+
+    # The global table is frozen into the compiled code as a constant
+    @njit(cache=True, boundscheck=False)
+    def _crc8_nb(buf):
+        crc = np.uint8(0)
+        for b in buf:
+            crc = _CRC8_TABLE_NP[crc ^ b]
+        return crc
+
+    def crc8(data: bytes) -> int:  # noqa: F811
+        """CRC-8 with polynomial 0x07, init 0x00 (Numba-compiled)."""
+        return int(_crc8_nb(np.frombuffer(data, np.uint8)))
+
+
 class Protocol:
     """Binary frame protocol over serial."""
 
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 30.0):
+    def __init__(self, port: str, baudrate: int = 12000000, timeout: float = 30.0):
+        # USB CDC ignores the baud rate
         self.ser = serial.Serial(port, baudrate, timeout=timeout)
+        self._tx = bytearray(4 + MAX_PAYLOAD)  # reused for every outgoing frame
+        self._rx = bytearray(4 + MAX_PAYLOAD)  # reused for every incoming frame
         time.sleep(2)  # wait for Pico USB CDC init
 
     def close(self):
@@ -76,69 +127,204 @@ class Protocol:
         for attempt in range(retries):
             try:
                 self.ser.reset_input_buffer()
-                frame = struct.pack("<BH", cmd, len(payload)) + payload
-                frame += bytes([crc8(frame)])
-                self.ser.write(frame)
-                return self._recv()
+                self.ser.write(self._frame(cmd, payload))
+                status, resp = self._recv()
+                return status, bytes(resp)
             except IOError:
                 if attempt == retries - 1:
                     raise
                 time.sleep(0.05)
 
-    def _recv(self) -> tuple[int, bytes]:
-        """Read a response frame. Returns (status, payload)."""
-        hdr = self._read_exact(3)
-        if hdr is None:
+    def send_pipelined(self, requests, window: int = 4, on_response=None, retries: int = 3):
+        """Send (cmd, payload) requests keeping up to `window` frames in flight.
+
+        The next frames are written while the device is still processing the
+        previous ones, hiding the USB round-trip latency. This relies on the
+        firmware handling requests strictly in order and answering each with
+        exactly one response frame, so requests must be safe to repeat.
+        On IOError (from the link or from on_response) the input is drained
+        and sending resumes from the first unacknowledged request, with
+        `retries` attempts per request as in send().
+        on_response(index, payload) is called once per request, in order; the
+        payload is a memoryview that is only valid during the callback.
+        """
+        requests = list(requests)
+        acked = 0
+        failures = 0
+        self.ser.reset_input_buffer()
+        while acked < len(requests):
+            sent = acked
+            try:
+                while acked < len(requests):
+                    while sent < len(requests) and sent - acked < window:
+                        self.ser.write(self._frame(*requests[sent]))
+                        sent += 1
+                    status, resp = self._recv()
+                    self._check_status(status)
+                    if on_response:
+                        on_response(acked, resp)
+                    acked += 1
+                    failures = 0
+            except IOError:
+                failures += 1
+                if failures == retries:
+                    raise
+                self._drain()
+
+    def _drain(self, quiet: float = 0.1):
+        """Discard input until nothing has arrived for `quiet` seconds, so
+        responses to frames still in flight are not mistaken for new ones."""
+        timeout = self.ser.timeout
+        self.ser.timeout = quiet
+        try:
+            while self.ser.read(4 + MAX_PAYLOAD):
+                pass
+        finally:
+            self.ser.timeout = timeout
+
+    def _frame(self, cmd: int, payload: bytes) -> memoryview:
+        """Build a frame in the TX buffer; valid until the next call."""
+        n = len(payload)
+        if n > MAX_PAYLOAD:
+            raise ValueError(f"payload too large: {n} > {MAX_PAYLOAD}")
+        tx = self._tx
+        _HDR.pack_into(tx, 0, cmd, n)
+        tx[3:3 + n] = payload
+        mv = memoryview(tx)
+        tx[3 + n] = crc8(mv[:3 + n])
+        return mv[:4 + n]
+
+    def _recv(self) -> tuple[int, memoryview]:
+        """Read a response frame into the RX buffer. Returns (status, payload);
+        the payload view is only valid until the next receive."""
+        rx = self._rx
+        mv = memoryview(rx)
+        if not self._read_exact_into(mv[:3]):
             raise IOError("timeout reading response header")
-        status = hdr[0]
-        length = struct.unpack("<H", hdr[1:3])[0]
-        payload = b""
-        if length > 0:
-            payload = self._read_exact(length)
-            if payload is None:
-                raise IOError("timeout reading response payload")
-        crc_byte = self._read_exact(1)
-        if crc_byte is None:
+        status = rx[0]
+        length = _U16.unpack_from(rx, 1)[0]
+        if length > MAX_PAYLOAD:
+            raise IOError(f"response too large: {length} bytes")
+        if length > 0 and not self._read_exact_into(mv[3:3 + length]):
+            raise IOError("timeout reading response payload")
+        if not self._read_exact_into(mv[3 + length:4 + length]):
             raise IOError("timeout reading response CRC")
-        expected = crc8(hdr + payload)
-        if crc_byte[0] != expected:
-            raise IOError(f"response CRC mismatch: got 0x{crc_byte[0]:02X}, expected 0x{expected:02X}")
-        return status, payload
+        expected = crc8(mv[:3 + length])
+        if rx[3 + length] != expected:
+            raise IOError(f"response CRC mismatch: got 0x{rx[3 + length]:02X}, expected 0x{expected:02X}")
+        return status, mv[3:3 + length]
 
-    def _read_exact(self, n: int) -> bytes | None:
-        data = self.ser.read(n)
-        if len(data) != n:
-            return None
-        return data
+    def _read_exact_into(self, mv: memoryview) -> bool:
+        return self.ser.readinto(mv) == len(mv)
 
     def send_ok(self, cmd: int, payload: bytes = b"") -> bytes:
         """Send command, raise on error, return response payload."""
         status, resp = self.send(cmd, payload)
+        self._check_status(status)
+        return resp
+
+    def max_payload(self) -> int:
+        """Largest payload the firmware accepts, from the VERSION response."""
+        resp = self.send_ok(CMD_VERSION)
+        _, sep, tail = resp.partition(b"\0")
+        if sep and len(tail) >= 2:
+            return min(_U16.unpack_from(tail)[0], MAX_PAYLOAD)
+        return LEGACY_PAYLOAD
+
+    @staticmethod
+    def _check_status(status: int):
         if status != STATUS_OK:
             name = STATUS_NAMES.get(status, f"0x{status:02X}")
             raise RuntimeError(f"device error: {name}")
-        return resp
+
+
+def chunk_size(value) -> int:
+    """Validate a READ chunk size. It must be even because the firmware reads
+    flash as 16-bit words, so an odd chunk misaligns every following READ."""
+    chunk = int(value, 0) if isinstance(value, str) else value
+    if chunk <= 0 or chunk % 2:
+        raise ValueError(f"chunk size must be a positive even number, got {value}")
+    return chunk
+
+
+def merge_chunks(chunks: list) -> tuple[int, bytearray]:
+    """Merge (addr, data) chunks into one 0xFF-padded (base, buffer)."""
+    base = min(addr for addr, _ in chunks)
+    end = max(addr + len(data) for addr, data in chunks)
+    buf = bytearray(b"\xFF" * (end - base))
+    for addr, data in chunks:
+        buf[addr - base:addr - base + len(data)] = data
+    return base, buf
+
+
+def add_flash_data(flash_pages: dict, addr: int, data) -> None:
+    """Copy data at addr into 0xFF-padded 128-byte pages keyed by page start."""
+    mv = memoryview(data)
+    pos = 0
+    while pos < len(mv):
+        page_start = ((addr + pos) // FLASH_PAGE_SIZE) * FLASH_PAGE_SIZE
+        off = addr + pos - page_start  # non-zero only for an unaligned head
+        n = min(FLASH_PAGE_SIZE - off, len(mv) - pos)
+        page = flash_pages.get(page_start)
+        if page is None:
+            page = flash_pages[page_start] = bytearray(ERASED_PAGE)
+        page[off:off + n] = mv[pos:pos + n]
+        pos += n
+
+
+def split_hex(ih: IntelHex) -> tuple[dict, list, list]:
+    """Route HEX data segment by segment into flash pages, config chunks
+    and EEPROM chunks, without walking individual addresses."""
+    flash_pages = {}    # page_start_addr -> bytearray(128)
+    config_chunks = []  # (addr, data)
+    eeprom_chunks = []  # (addr, data)
+
+    for seg_start, seg_end in ih.segments():
+        # Split at region boundaries so each piece belongs to one region
+        cuts = [seg_start] + [b for b in REGION_BOUNDS if seg_start < b < seg_end] + [seg_end]
+        for lo, hi in zip(cuts, cuts[1:]):
+            data = ih.tobinarray(start=lo, size=hi - lo)
+            if CONFIG_START <= lo <= CONFIG_END:
+                config_chunks.append((lo, data))
+            elif lo >= EEPROM_START:
+                eeprom_chunks.append((lo, data))
+            else:
+                add_flash_data(flash_pages, lo, data)
+
+    return flash_pages, config_chunks, eeprom_chunks
+
+
+_progress_filled = -1   # last drawn bar width, -1 at the start of a phase
+_progress_time = 0.0
 
 
 def progress_bar(current: int, total: int, width: int = 40, prefix: str = ""):
+    """Redraw the bar only when it changes or every 50 ms, always on completion."""
+    global _progress_filled, _progress_time
     frac = current / total if total else 1
     filled = int(width * frac)
+    now = time.monotonic()
+    if current < total and filled == _progress_filled and now - _progress_time < 0.05:
+        return
+    _progress_filled, _progress_time = filled, now
     bar = "█" * filled + "░" * (width - filled)
     pct = frac * 100
     print(f"\r{prefix}[{bar}] {pct:5.1f}% ({current}/{total})", end="", flush=True)
     if current >= total:
         print()
+        _progress_filled = -1
 
 
 def cmd_version(proto: Protocol):
     resp = proto.send_ok(CMD_VERSION)
-    print(f"Firmware: {resp.decode('utf-8', errors='replace')}")
+    version = resp.partition(b"\0")[0]
+    print(f"Firmware: {version.decode('utf-8', errors='replace')}")
 
 
 def cmd_diag(proto: Protocol):
     resp = proto.send_ok(CMD_DIAG)
-    dev_id = struct.unpack("<H", resp[0:2])[0]
-    rev_id = struct.unpack("<H", resp[2:4])[0]
+    dev_id = _U16.unpack_from(resp, 0)[0]
+    rev_id = _U16.unpack_from(resp, 2)[0]
     name = resp[4:].decode("utf-8", errors="replace")
     rev_major = chr(((rev_id >> 6) & 0x1F) + 65)
     rev_minor = rev_id & 0x3F
@@ -158,7 +344,7 @@ def cmd_write(proto: Protocol, hex_file: str):
 
     # 1) Diag
     resp = proto.send_ok(CMD_DIAG)
-    dev_id = struct.unpack("<H", resp[0:2])[0]
+    dev_id = _U16.unpack_from(resp, 0)[0]
     name = resp[4:].decode("utf-8", errors="replace")
     print(f"Target: {name} (0x{dev_id:04X})")
 
@@ -168,53 +354,40 @@ def cmd_write(proto: Protocol, hex_file: str):
     print(" done.")
 
     # 3) Collect pages from HEX
-    flash_pages = {}  # page_start_addr -> bytearray(128)
-    config_data = {}  # addr -> byte
-    eeprom_data = {}  # addr -> byte
-
-    for addr in ih.addresses():
-        val = ih[addr]
-        if CONFIG_START <= addr <= CONFIG_END:
-            config_data[addr] = val
-        elif addr >= EEPROM_START:
-            eeprom_data[addr] = val
-        else:
-            page_start = (addr // FLASH_PAGE_SIZE) * FLASH_PAGE_SIZE
-            if page_start not in flash_pages:
-                flash_pages[page_start] = bytearray([0xFF] * FLASH_PAGE_SIZE)
-            flash_pages[page_start][addr - page_start] = val
-
-    # 4) Write flash pages
-    pages = sorted(flash_pages.keys())
+    flash_pages, config_chunks, eeprom_chunks = split_hex(ih)
+
+    # 4) Write flash pages, skipping blank ones (already 0xFF after erase)
+    pages = [p for p in sorted(flash_pages.keys()) if flash_pages[p] != ERASED_PAGE]
     total = len(pages)
+    skipped = len(flash_pages) - total
+    if skipped:
+        print(f"Skipping {skipped} blank flash pages.")
     if total:
         print(f"Writing {total} flash pages...")
+        # Pack every addr(4) + data(128) payload into one contiguous buffer
+        stride = 4 + FLASH_PAGE_SIZE
+        payloads = bytearray(total * stride)
         for i, page_addr in enumerate(pages):
-            payload = struct.pack("<I", page_addr) + bytes(flash_pages[page_addr])
-            proto.send_ok(CMD_WRITE_PAGE, payload)
-            progress_bar(i + 1, total, prefix="  Flash: ")
+            _ADDR.pack_into(payloads, i * stride, page_addr)
+            payloads[i * stride + 4:(i + 1) * stride] = flash_pages[page_addr]
+        mv = memoryview(payloads)
+        requests = [(CMD_WRITE_PAGE, mv[i * stride:(i + 1) * stride]) for i in range(total)]
+        proto.send_pipelined(requests,
+                             on_response=lambda i, _: progress_bar(i + 1, total, prefix="  Flash: "))
 
     # 5) Write config
-    if config_data:
-        base = min(config_data.keys())
-        end = max(config_data.keys()) + 1
-        length = end - base
-        buf = bytearray([0xFF] * length)
-        for addr, val in config_data.items():
-            buf[addr - base] = val
-        payload = struct.pack("<IH", base, length) + bytes(buf)
+    if config_chunks:
+        base, buf = merge_chunks(config_chunks)
+        length = len(buf)
+        payload = _ADDR_LEN.pack(base, length) + bytes(buf)
         print("Writing config words...", end="", flush=True)
         proto.send_ok(CMD_WRITE_CONFIG, payload)
         print(" done.")
 
     # 6) Write EEPROM
-    if eeprom_data:
-        base = min(eeprom_data.keys())
-        end = max(eeprom_data.keys()) + 1
-        length = end - base
-        buf = bytearray([0xFF] * length)
-        for addr, val in eeprom_data.items():
-            buf[addr - base] = val
+    if eeprom_chunks:
+        base, buf = merge_chunks(eeprom_chunks)
+        length = len(buf)
         # Send in chunks to stay within payload limit
         chunk = 128
         total_chunks = (length + chunk - 1) // chunk
@@ -222,7 +395,7 @@ def cmd_write(proto: Protocol, hex_file: str):
         for ci in range(total_chunks):
             offset = ci * chunk
             n = min(chunk, length - offset)
-            payload = struct.pack("<IH", base + offset, n) + bytes(buf[offset:offset + n])
+            payload = _ADDR_LEN.pack(base + offset, n) + bytes(buf[offset:offset + n])
             proto.send_ok(CMD_WRITE_EEPROM, payload)
             progress_bar(ci + 1, total_chunks, prefix="  EEPROM: ")
 
@@ -231,8 +404,9 @@ def cmd_write(proto: Protocol, hex_file: str):
     print("Write complete.")
 
 
-def cmd_verify(proto: Protocol, hex_file: str):
+def cmd_verify(proto: Protocol, hex_file: str, chunk: int = READ_CHUNK):
     ih = IntelHex(hex_file)
+    chunk = min(chunk_size(chunk), proto.max_payload())
 
     segments = ih.segments()
     mismatches = 0
@@ -241,26 +415,32 @@ def cmd_verify(proto: Protocol, hex_file: str):
     total_bytes = sum(end - start for start, end in segments)
     bytes_checked = 0
 
-    print(f"Verifying against {hex_file}...")
+    # Build every READ request up front so they can be pipelined
+    reads = []  # (addr, expected bytes)
     for seg_start, seg_end in segments:
         seg_len = seg_end - seg_start
-
-        for offset in range(0, seg_len, READ_CHUNK):
-            addr = seg_start + offset
-            n = min(READ_CHUNK, seg_len - offset)
-            payload = struct.pack("<IH", addr, n)
-            resp = proto.send_ok(CMD_READ, payload)
-
-            for i in range(n):
-                expected = ih[addr + i]
-                actual = resp[i]
+        expected_arr = ih.tobinarray(start=seg_start, end=seg_end - 1)
+        for offset in range(0, seg_len, chunk):
+            n = min(chunk, seg_len - offset)
+            reads.append((seg_start + offset, bytes(expected_arr[offset:offset + n])))
+
+    def compare(i: int, resp: memoryview):
+        nonlocal mismatches, bytes_checked
+        addr, exp = reads[i]
+        if len(resp) != len(exp):
+            raise IOError(f"short READ at 0x{addr:06X}: got {len(resp)} of {len(exp)} bytes")
+        if resp != exp:
+            for j, (expected, actual) in enumerate(zip(exp, resp)):
                 if expected != actual:
                     if mismatches < 10:
-                        print(f"  Mismatch at 0x{addr + i:06X}: expected 0x{expected:02X}, read 0x{actual:02X}")
+                        print(f"  Mismatch at 0x{addr + j:06X}: expected 0x{expected:02X}, read 0x{actual:02X}")
                     mismatches += 1
+        bytes_checked += len(exp)
+        progress_bar(bytes_checked, total_bytes, prefix="  Verify: ")
 
-            bytes_checked += n
-            progress_bar(bytes_checked, total_bytes, prefix="  Verify: ")
+    print(f"Verifying against {hex_file}...")
+    proto.send_pipelined([(CMD_READ, _ADDR_LEN.pack(addr, len(exp))) for addr, exp in reads],
+                         on_response=compare)
 
     proto.send_ok(CMD_RESET_TARGET)
     if mismatches == 0:
@@ -270,33 +450,43 @@ def cmd_verify(proto: Protocol, hex_file: str):
         sys.exit(1)
 
 
-def cmd_dump(proto: Protocol, filename: str, start: int, size: int, fmt: str):
-    ih = IntelHex()
+def cmd_dump(proto: Protocol, filename: str, start: int, size: int, fmt: str,
+             chunk: int = READ_CHUNK):
+    buf = bytearray(size)
+    chunk = min(chunk_size(chunk), proto.max_payload())
     total_read = 0
 
-    print(f"Reading {size} bytes from 0x{start:06X}...")
-    for offset in range(0, size, READ_CHUNK):
-        addr = start + offset
-        n = min(READ_CHUNK, size - offset)
-        payload = struct.pack("<IH", addr, n)
-        resp = proto.send_ok(CMD_READ, payload)
-        for i in range(n):
-            ih[addr + i] = resp[i]
+    reads = [(start + offset, min(chunk, size - offset)) for offset in range(0, size, chunk)]
+
+    def store(i: int, resp: memoryview):
+        nonlocal total_read
+        addr, n = reads[i]
+        if len(resp) != n:
+            raise IOError(f"short READ at 0x{addr:06X}: got {len(resp)} of {n} bytes")
+        offset = addr - start
+        buf[offset:offset + n] = resp
         total_read += n
         progress_bar(total_read, size, prefix="  Read: ")
 
+    print(f"Reading {size} bytes from 0x{start:06X}...")
+    proto.send_pipelined([(CMD_READ, _ADDR_LEN.pack(addr, n)) for addr, n in reads],
+                         on_response=store)
+
     proto.send_ok(CMD_RESET_TARGET)
 
     if fmt == "bin":
-        ih.tobinfile(filename)
+        with open(filename, "wb") as f:
+            f.write(buf)
     else:
+        ih = IntelHex()
+        ih.frombytes(bytes(buf), offset=start)
         ih.write_hex_file(filename)
     print(f"Saved to {filename}")
 
 
 def cmd_config(proto: Protocol):
     # Read 16 bytes at 0x300000
-    payload = struct.pack("<IH", CONFIG_START, 16)
+    payload = _ADDR_LEN.pack(CONFIG_START, 16)
     resp = proto.send_ok(CMD_READ, payload)
     proto.send_ok(CMD_RESET_TARGET)
 
@@ -381,12 +571,16 @@ def main():
 
     p = sub.add_parser("verify", help="Verify against HEX file")
     p.add_argument("file", help="Intel HEX file")
+    p.add_argument("--chunk", default=READ_CHUNK, type=chunk_size,
+                   help=f"Bytes per READ, capped by firmware (default: {READ_CHUNK})")
 
     p = sub.add_parser("dump", help="Read memory to file")
     p.add_argument("file", help="Output file")
     p.add_argument("--start", default=0, type=lambda x: int(x, 0), help="Start address (default: 0)")
     p.add_argument("--size", default=131072, type=lambda x: int(x, 0), help="Size in bytes (default: 128K)")
     p.add_argument("--format", choices=["hex", "bin"], default="hex", help="Output format")
+    p.add_argument("--chunk", default=READ_CHUNK, type=chunk_size,
+                   help=f"Bytes per READ, capped by firmware (default: {READ_CHUNK})")
 
     sub.add_parser("config", help="Read and decode config bits")
     sub.add_parser("test_eeprom", help="EEPROM write/read self-test")
@@ -405,9 +599,9 @@ def main():
         elif args.command == "write":
             cmd_write(proto, args.file)
         elif args.command == "verify":
-            cmd_verify(proto, args.file)
+            cmd_verify(proto, args.file, args.chunk)
         elif args.command == "dump":
-            cmd_dump(proto, args.file, args.start, args.size, args.format)
+            cmd_dump(proto, args.file, args.start, args.size, args.format, args.chunk)
         elif args.command == "config":
             cmd_config(proto)
         elif args.command == "test_eeprom":